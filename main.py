@@ -1,11 +1,16 @@
 import logging
-from typing import List, Dict, Any, Set
+import os
+from typing import List, Dict, Any, Iterable, Optional, Set
 
 from twitter_scraper import TwitterScraper
 
 import pandas as pd
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
+import scipy.sparse as sp
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+from sklearn.pipeline import Pipeline
 import matplotlib.pyplot as plt
 
 # =========================
@@ -27,65 +32,144 @@ HASHTAGS = ["#nifty50", "#sensex", "#intraday", "#banknifty"]
 MIN_TWEETS = 2000
 DATA_PATH = "tweets.parquet"
 TIME_WINDOW_HOURS = 24
+PARQUET_ROW_GROUP_SIZE = 50_000
+DEDUP_COLUMNS = ["username", "timestamp", "content"]
+TWEET_SCHEMA = pa.schema([
+    ("tweet_id", pa.string()),
+    # Usernames repeat heavily across tweets, store them dictionary-encoded
+    ("username", pa.dictionary(pa.int32(), pa.string())),
+    ("timestamp", pa.timestamp("ns", tz="UTC")),
+    ("content", pa.string()),
+    ("likes", pa.int64()),
+    ("retweets", pa.int64()),
+    ("replies", pa.int64()),
+    ("mentions", pa.list_(pa.string())),
+    ("hashtags", pa.list_(pa.string())),
+])
 
 # =========================
 # Utility Functions
 # =========================
 
-def deduplicate_tweets(tweets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    seen: Set[str] = set()
-    deduped = []
-    for tweet in tweets:
-        key = tweet["username"] + tweet["timestamp"] + tweet["content"]
-        if key not in seen:
-            deduped.append(tweet)
-            seen.add(key)
-    return deduped
+def deduplicate_tweets(df: pd.DataFrame, seen: Optional[Set[int]] = None) -> pd.DataFrame:
+    # Vectorized dedup, pandas hashes the key columns in C
+    df = df.drop_duplicates(subset=DEDUP_COLUMNS, keep="first")
+    if seen is not None:
+        # Also drop rows whose key hash was already stored from an earlier batch
+        hashes = pd.util.hash_pandas_object(df[DEDUP_COLUMNS], index=False)
+        new = ~hashes.isin(seen)
+        df = df[new.to_numpy()].copy()
+        seen.update(hashes[new].tolist())
+    return df
 
 # =========================
 # Data Processing & Storage
 # =========================
 
-def process_and_store(tweets: List[Dict[str, Any]], path: str):
-    # Deduplicate
-    tweets = deduplicate_tweets(tweets)
+def tweets_to_table(tweets: List[Dict[str, Any]], seen: Optional[Set[int]] = None) -> pa.Table:
     # DataFrame construction
     df = pd.DataFrame(tweets)
+    # Deduplicate, across batches too when a seen-key set is passed
+    df = deduplicate_tweets(df, seen)
     # Clean and normalize
-    if "content" in df.columns:
-        df["content"] = df["content"].astype(str)
-        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
-        # Handle Unicode and special characters
-        df["content"] = df["content"].apply(lambda x: x.encode("utf-8", "ignore").decode("utf-8"))
-        # Store as Parquet
-        df.to_parquet(path, index=False)
-        logging.info(f"Stored {len(df)} tweets to {path}")
-    return df
+    # Timestamps are ISO 8601 strings from the <time> tag or isoformat(), skip format inference
+    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce", utc=True, format="ISO8601")
+    df["username"] = df["username"].astype("category")
+    # Convert straight to the fixed Arrow schema
+    return pa.Table.from_pandas(df, schema=TWEET_SCHEMA, preserve_index=False)
+
+def process_and_store(batches: Iterable[List[Dict[str, Any]]], path: str) -> int:
+    # Append batches to the Parquet file as they arrive, buffering at most one
+    # PARQUET_ROW_GROUP_SIZE row group in memory so small worker batches do not
+    # each become their own row group. Only hashes of the cleaned dedup keys
+    # are kept, so duplicates are dropped corpus-wide. Rows go to a temp file
+    # that replaces path only once all are written, so a failure or Ctrl-C
+    # mid-scrape leaves the previous file intact.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    writer = None
+    stored = 0
+    seen: Set[int] = set()
+    pending: List[pa.Table] = []
+    pending_rows = 0
+
+    def flush():
+        nonlocal writer, pending, pending_rows
+        if writer is None:
+            writer = pq.ParquetWriter(
+                tmp_path,
+                TWEET_SCHEMA,
+                compression="zstd",
+                compression_level=3,
+                use_dictionary=True,
+                data_page_size=1 << 20
+            )
+        writer.write_table(pa.concat_tables(pending), row_group_size=PARQUET_ROW_GROUP_SIZE)
+        pending, pending_rows = [], 0
+
+    try:
+        for tweets in batches:
+            if not tweets:
+                continue
+            table = tweets_to_table(tweets, seen)
+            if table.num_rows == 0:
+                continue
+            pending.append(table)
+            pending_rows += table.num_rows
+            stored += table.num_rows
+            if pending_rows >= PARQUET_ROW_GROUP_SIZE:
+                flush()
+        if pending:
+            flush()
+        if writer is not None:
+            writer.close()
+            writer = None
+            os.replace(tmp_path, path)
+    finally:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_path):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+    if stored:
+        logging.info(f"Stored {stored} tweets to {path}")
+    return stored
 
 # =========================
 # Text-to-Signal Conversion
 # =========================
 
-def text_to_signal(df: pd.DataFrame) -> np.ndarray:
-    # Use TF-IDF for vectorization
-    vectorizer = TfidfVectorizer(
-        max_features=256,
-        stop_words="english",
-        strip_accents="unicode",
-        ngram_range=(1, 2)
-    )
-    tfidf_matrix = vectorizer.fit_transform(df["content"].values)
-    return tfidf_matrix.toarray()
-
-def aggregate_signals(signals: np.ndarray) -> Dict[str, Any]:
-    # Composite signal: mean, std, confidence interval
-    mean_signal = np.mean(signals, axis=0)
-    std_signal = np.std(signals, axis=0)
-    n = signals.shape[0]
-    ci95 = 1.96 * std_signal / np.sqrt(n) if n > 0 else 0
+def text_to_signal(df: pd.DataFrame) -> sp.csr_matrix:
+    # Use hashed TF-IDF for vectorization, no vocabulary to build or prune
+    vectorizer = Pipeline([
+        ("hash", HashingVectorizer(
+            n_features=256,
+            stop_words="english",
+            strip_accents="unicode",
+            ngram_range=(1, 2),
+            alternate_sign=False,
+            norm=None
+        )),
+        ("tfidf", TfidfTransformer())
+    ])
+    tfidf_matrix = vectorizer.fit_transform(df["content"])
+    # Keep the sparse CSR output, TF-IDF rows are mostly zeros
+    return tfidf_matrix
+
+def aggregate_signals(signals: sp.csr_matrix) -> Dict[str, Any]:
+    # Composite signal summary: feature count, mean std and mean 95% CI, as scalars.
+    # One pass over the non-zeros gives per-column sums of X and X^2,
+    # std then follows from E[X^2] - E[X]^2 without densifying
+    n, n_features = signals.shape
+    sx = np.bincount(signals.indices, weights=signals.data, minlength=n_features)
+    sx2 = np.bincount(signals.indices, weights=signals.data * signals.data, minlength=n_features)
+    mean_signal = sx / n
+    std_mean = float(np.sqrt(np.maximum(sx2 / n - mean_signal * mean_signal, 0)).mean())
+    ci95 = 1.96 * std_mean / np.sqrt(n) if n > 0 else 0.0
     return {
-        "mean": mean_signal,
-        "std": std_signal,
+        "n_features": n_features,
+        "std": std_mean,
         "ci95": ci95
     }
 
@@ -93,15 +177,16 @@ def aggregate_signals(signals: np.ndarray) -> Dict[str, Any]:
 # Memory-Efficient Visualization
 # =========================
 
-def plot_signals(signals: np.ndarray, sample_size: int = 500):
-    # Sample for memory efficiency
+def plot_signals(signals: sp.csr_matrix, sample_size: int = 500):
+    # Sample for memory efficiency, CSR row slicing only touches the sampled non-zeros
     if signals.shape[0] > sample_size:
-        idx = np.random.choice(signals.shape[0], sample_size, replace=False)
+        rng = np.random.default_rng()
+        idx = rng.choice(signals.shape[0], sample_size, replace=False, shuffle=False)
         sampled = signals[idx]
     else:
         sampled = signals
     plt.figure(figsize=(10, 4))
-    plt.plot(np.mean(sampled, axis=1))
+    plt.plot(np.asarray(sampled.mean(axis=1)).ravel())
     plt.title("Mean TF-IDF Signal per Tweet (Sampled)")
     plt.xlabel("Sampled Tweet Index")
     plt.ylabel("Mean TF-IDF Value")
@@ -114,18 +199,18 @@ def plot_signals(signals: np.ndarray, sample_size: int = 500):
 
 def main():
     scraper = TwitterScraper(HASHTAGS, MIN_TWEETS, TIME_WINDOW_HOURS)
-    scraper.run()
-    if len(scraper.tweets) < MIN_TWEETS:
-        logging.warning(f"Only {len(scraper.tweets)} tweets collected, less than target {MIN_TWEETS}")
-    print(scraper.tweets)
-    if scraper.tweets:
-        df = process_and_store(scraper.tweets, DATA_PATH)
+    stored = process_and_store(scraper.iter_batches(), DATA_PATH)
+    if stored < MIN_TWEETS:
+        logging.warning(f"Only {stored} tweets collected, less than target {MIN_TWEETS}")
+    if stored:
+        # Only the text column is needed for the signals
+        df = pd.read_parquet(DATA_PATH, columns=["content"])
         signals = text_to_signal(df)
         agg = aggregate_signals(signals)
-        logging.info(f"Signal mean shape: {agg['mean'].shape}, std: {agg['std'].mean():.4f}, ci95: {agg['ci95'].mean():.4f}")
+        logging.info(f"Signal features: {agg['n_features']}, std: {agg['std']:.4f}, ci95: {agg['ci95']:.4f}")
         plot_signals(signals)
         # Save signals for downstream trading models
-        np.save("signals.npy", signals)
+        sp.save_npz("signals.npz", signals)
 
 if __name__ == "__main__":
     main()
@@ -3,14 +3,16 @@ import time
 import logging
 import random
 import os
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Set
+import json
+import multiprocessing
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Set, Tuple, Union, Iterator
 
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options as ChromeOptions
 from selenium.webdriver.common.keys import Keys
-from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
@@ -19,6 +21,11 @@ from selenium.webdriver.support import expected_conditions as EC
 # Constants & Config
 # =========================
 SEARCH_URL = "https://twitter.com/search?q={query}&src=typed_query&f=live"
+# Upper bound on concurrent browser processes, each reused across its hashtags
+MAX_WORKERS = 4
+# Seconds to wait for the first tweets to render and for a scroll to load more
+PAGE_LOAD_WAIT = 15
+SCROLL_WAIT = 5
 HEADERS_LIST = [
     # List of user agents to rotate for anti-bot
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -26,25 +33,56 @@ HEADERS_LIST = [
     "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
 ]
 
+# Reads every rendered tweet in a single execute_script call instead of
+# one WebDriver round-trip per field per article
+EXTRACT_ARTICLES_JS = """
+const metric = (a, id) => {
+    const el = a.querySelector(`[data-testid="${id}"]`);
+    return el ? (el.getAttribute("aria-label") || el.innerText) : null;
+};
+return Array.from(document.querySelectorAll("article")).map(a => ({
+    user: a.querySelector('a[href^="/"]:not([href*="/status/"])')?.innerText ?? null,
+    time: a.querySelector("time")?.getAttribute("datetime") ?? null,
+    text: a.querySelector('[data-testid="tweetText"]')?.innerText ?? null,
+    likes: metric(a, "like"),
+    retweets: metric(a, "retweet"),
+    replies: metric(a, "reply"),
+    href: a.querySelector('a[href*="/status/"]')?.href ?? null
+}));
+"""
+
+# Precompiled regexes, used once or more per tweet
+_HASHTAG_RE = re.compile(r"#(\w+)")
+_MENTION_RE = re.compile(r"@(\w+)")
+_CLEAN_RE = re.compile(r"http\S+|@\w+|#")
+_WS_RE = re.compile(r"\s+")
+_METRIC_RE = re.compile(r"(\d[\d,]*)")
+_STATUS_RE = re.compile(r"/status/(\d+)")
+
 # =========================
 # Twitter Login Credentials
 # =========================
 # You can set these as environment variables for security, or hardcode for testing (not recommended)
 TWITTER_USERNAME = os.environ.get("TWITTER_USERNAME", "")
 TWITTER_PASSWORD = os.environ.get("TWITTER_PASSWORD", "")
+# Session cookies saved after a successful login, reused by later runs
+COOKIES_PATH = "cookies.json"
 
 def extract_hashtags(text: str) -> List[str]:
-    return re.findall(r"#(\w+)", text)
+    return _HASHTAG_RE.findall(text)
 
 def extract_mentions(text: str) -> List[str]:
-    return re.findall(r"@(\w+)", text)
+    return _MENTION_RE.findall(text)
+
+def tweet_key(tweet: Dict[str, Any]) -> Union[str, Tuple[str, str, str]]:
+    # Status id when present, otherwise the (username, timestamp, content) tuple,
+    # which hashes the cached str hashes without building a concatenated string
+    return tweet.get("tweet_id") or (tweet["username"], tweet["timestamp"], tweet["content"])
 
 def clean_text(text: str) -> str:
-    # Remove URLs, mentions, emojis, and normalize whitespace
-    text = re.sub(r"http\S+", "", text)
-    text = re.sub(r"@\w+", "", text)
-    text = re.sub(r"#", "", text)
-    text = re.sub(r"\s+", " ", text)
+    # Remove URLs, mentions and '#' in a single pass, then normalize whitespace
+    text = _CLEAN_RE.sub("", text)
+    text = _WS_RE.sub(" ", text)
     text = text.strip()
     return text
 
@@ -101,6 +139,51 @@ def twitter_login(driver, username: str, password: str, timeout: int = 30) -> bo
         logging.error(f"Twitter login failed: {e}")
         return False
 
+def restore_session(driver, path: str = COOKIES_PATH, timeout: int = 10) -> bool:
+    """
+    Load saved session cookies into the driver instead of logging in.
+    Returns True if the restored session is still logged in, False otherwise.
+    """
+    if not os.path.exists(path):
+        return False
+    try:
+        with open(path) as f:
+            cookies = json.load(f)
+        # Cookies can only be added for the domain currently loaded
+        driver.get("https://twitter.com/")
+        for cookie in cookies:
+            driver.add_cookie(cookie)
+        driver.get("https://twitter.com/home")
+        WebDriverWait(driver, timeout).until(
+            EC.presence_of_element_located((By.XPATH, "//a[@href='/home']"))
+        )
+        logging.info("Restored Twitter session from saved cookies.")
+        return True
+    except Exception as e:
+        logging.info(f"Saved Twitter session not usable, logging in again: {e}")
+        # Drop the stale cookies so the fallback login starts from a clean session
+        try:
+            driver.delete_all_cookies()
+        except Exception:
+            pass
+        return False
+
+def save_session(driver, path: str = COOKIES_PATH):
+    # Write to a per-process temp file first, workers may save concurrently.
+    # The file holds live session tokens, so it is readable by the owner only.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(driver.get_cookies(), f)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logging.warning(f"Could not save Twitter session cookies: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
 # =========================
 # Scraper Implementation (Selenium)
 # =========================
@@ -112,7 +195,7 @@ class TwitterScraper:
         self.tweets_per_hashtag = min_tweets // len(hashtags)
         self.time_window = timedelta(hours=time_window_hours)
         self.tweets: List[Dict[str, Any]] = []
-        self.seen_ids: Set[str] = set()
+        self.seen_keys: Set[Union[str, Tuple[str, str, str]]] = set()
 
     def get_driver(self):
         chrome_options = ChromeOptions()
@@ -126,34 +209,29 @@ class TwitterScraper:
         driver.set_page_load_timeout(60)
         return driver
 
-    def scrape_hashtag(self, hashtag: str):
+    def scrape_hashtag(self, driver, hashtag: str):
+        # Expects a driver that is already logged in, navigation replaces the page
         logging.info(f"Scraping for hashtag: {hashtag}")
         collected = 0
         max_attempts = 30
         attempts = 0
         scroll_attempts = 0
         last_height = 0
+        # Shared fallback timestamp for tweets without a <time> tag in this batch
+        self._now_iso = datetime.now(timezone.utc).isoformat()
         try:
-            driver = self.get_driver()
-            # --- Twitter login before scraping ---
-            if not TWITTER_USERNAME or not TWITTER_PASSWORD:
-                logging.error("Twitter credentials not set. Set TWITTER_USERNAME and TWITTER_PASSWORD as environment variables.")
-                return
-            login_success = twitter_login(driver, TWITTER_USERNAME, TWITTER_PASSWORD)
-            if not login_success:
-                logging.error("Twitter login failed. Skipping hashtag scraping.")
-                try:
-                    driver.quit()
-                except Exception:
-                    pass
-                return
-            # --- End login ---
             url = SEARCH_URL.format(query=hashtag.replace("#", "%23") + "%20lang%3Aen")
             driver.get(url)
-            time.sleep(random.uniform(3, 6))
+            try:
+                WebDriverWait(driver, PAGE_LOAD_WAIT).until(
+                    EC.presence_of_element_located((By.TAG_NAME, "article"))
+                )
+            except TimeoutException:
+                pass
             while collected < self.tweets_per_hashtag and attempts < max_attempts and scroll_attempts < 50:
                 try:
-                    articles = driver.find_elements(By.TAG_NAME, "article")
+                    # One round-trip to the browser for every article on the page
+                    articles = driver.execute_script(EXTRACT_ARTICLES_JS)
                     if not articles:
                         logging.warning(f"No articles found for {hashtag} on attempt {attempts}")
                         time.sleep(random.uniform(2, 5))
@@ -164,20 +242,25 @@ class TwitterScraper:
                             tweet = self.parse_tweet(article)
                             if not tweet:
                                 continue
-                            tweet_id = tweet.get("tweet_id")
-                            if tweet_id and tweet_id in self.seen_ids:
+                            key = tweet_key(tweet)
+                            if key in self.seen_keys:
                                 continue
                             self.tweets.append(tweet)
-                            if tweet_id:
-                                self.seen_ids.add(tweet_id)
+                            self.seen_keys.add(key)
                             collected += 1
                             if collected >= self.tweets_per_hashtag:
                                 break
                         except Exception as e:
                             logging.debug(f"Error parsing tweet: {e}")
-                    # Scroll to load more tweets
+                    # Scroll to load more tweets, waiting only until the page grows
+                    before = driver.execute_script("return document.body.scrollHeight")
                     driver.find_element(By.TAG_NAME, "body").send_keys(Keys.END)
-                    time.sleep(random.uniform(2.5, 3.5))
+                    try:
+                        WebDriverWait(driver, SCROLL_WAIT).until(
+                            lambda d, h=before: d.execute_script("return document.body.scrollHeight") != h
+                        )
+                    except TimeoutException:
+                        pass
                     new_height = driver.execute_script("return document.body.scrollHeight")
                     if new_height == last_height:
                         scroll_attempts += 1
@@ -191,74 +274,35 @@ class TwitterScraper:
                     attempts += 1
         except Exception as e:
             logging.error(f"WebDriver error for {hashtag}: {e}")
-        finally:
-            try:
-                driver.quit()
-            except Exception:
-                pass
         logging.info(f"Finished scraping {hashtag}: {collected} tweets collected.")
         return collected
 
-    def parse_tweet(self, article) -> Dict[str, Any]:
-        # Selenium WebElement parsing
+    def parse_tweet(self, raw: Dict[str, Any]) -> Dict[str, Any]:
+        # Parses one article record returned by EXTRACT_ARTICLES_JS
         try:
-            # Username
-            username = "unknown"
-            try:
-                username_tag = article.find_element(By.XPATH, ".//a[starts-with(@href, '/') and not(contains(@href, '/status/'))]")
-                username = username_tag.text.strip()
-            except NoSuchElementException:
-                pass
-            # Timestamp
-            try:
-                time_tag = article.find_element(By.XPATH, ".//time")
-                timestamp = time_tag.get_attribute("datetime")
-            except NoSuchElementException:
-                timestamp = datetime.utcnow().isoformat()
-            # Tweet content
-            try:
-                content_div = article.find_element(By.XPATH, ".//div[@data-testid='tweetText']")
-                content = content_div.text.strip()
-            except NoSuchElementException:
-                content = ""
+            username = (raw.get("user") or "").strip() or "unknown"
+            timestamp = raw.get("time") or self._now_iso
+            content = (raw.get("text") or "").strip()
             # Engagement metrics (likes, retweets, replies)
-            metrics = {"likes": 0, "retweets": 0, "replies": 0}
-            try:
-                like_divs = article.find_elements(By.XPATH, ".//div[@data-testid='like']")
-                retweet_divs = article.find_elements(By.XPATH, ".//div[@data-testid='retweet']")
-                reply_divs = article.find_elements(By.XPATH, ".//div[@data-testid='reply']")
-                for div in like_divs:
-                    txt = div.get_attribute("aria-label") or div.text
-                    metrics["likes"] = self.extract_metric(txt)
-                for div in retweet_divs:
-                    txt = div.get_attribute("aria-label") or div.text
-                    metrics["retweets"] = self.extract_metric(txt)
-                for div in reply_divs:
-                    txt = div.get_attribute("aria-label") or div.text
-                    metrics["replies"] = self.extract_metric(txt)
-            except Exception:
-                pass
+            likes = self.extract_metric(raw.get("likes") or "")
+            retweets = self.extract_metric(raw.get("retweets") or "")
+            replies = self.extract_metric(raw.get("replies") or "")
             # Mentions and hashtags
             mentions = extract_mentions(content)
             hashtags = extract_hashtags(content)
             # Tweet ID
             tweet_id = None
-            try:
-                tweet_link = article.find_element(By.XPATH, ".//a[contains(@href, '/status/')]")
-                href = tweet_link.get_attribute("href")
-                match = re.search(r"/status/(\d+)", href)
-                if match:
-                    tweet_id = match.group(1)
-            except NoSuchElementException:
-                pass
+            match = _STATUS_RE.search(raw.get("href") or "")
+            if match:
+                tweet_id = match.group(1)
             return {
                 "tweet_id": tweet_id or "",
                 "username": username,
                 "timestamp": timestamp,
                 "content": clean_text(content),
-                "likes": metrics["likes"],
-                "retweets": metrics["retweets"],
-                "replies": metrics["replies"],
+                "likes": likes,
+                "retweets": retweets,
+                "replies": replies,
                 "mentions": mentions,
                 "hashtags": hashtags
             }
@@ -268,14 +312,60 @@ class TwitterScraper:
 
     def extract_metric(self, text: str) -> int:
         # Extracts numbers from engagement text
-        match = re.search(r"(\d[\d,]*)", text)
+        match = _METRIC_RE.search(text)
         if match:
             return int(match.group(1).replace(",", ""))
         return 0
 
-    def run(self):
+    def _scrape_chunk(self, hashtags: List[str]) -> List[Dict[str, Any]]:
+        # Runs in a worker process on its own copy of the scraper, one
+        # logged-in driver is reused for every hashtag in the chunk
+        self.tweets = []
+        self.seen_keys = set()
+        driver = None
+        try:
+            driver = self.get_driver()
+            # Only go through the login flow when the saved session has expired
+            if not restore_session(driver):
+                if not TWITTER_USERNAME or not TWITTER_PASSWORD:
+                    logging.error("Twitter credentials not set. Set TWITTER_USERNAME and TWITTER_PASSWORD as environment variables.")
+                    return self.tweets
+                if not twitter_login(driver, TWITTER_USERNAME, TWITTER_PASSWORD):
+                    logging.error(f"Twitter login failed. Skipping hashtags: {', '.join(hashtags)}")
+                    return self.tweets
+                save_session(driver)
+            for hashtag in hashtags:
+                self.scrape_hashtag(driver, hashtag)
+        except Exception as e:
+            logging.error(f"WebDriver error: {e}")
+        finally:
+            if driver is not None:
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+        return self.tweets
+
+    def iter_batches(self) -> Iterator[List[Dict[str, Any]]]:
+        # Selenium drivers are not thread-safe, so scrape in separate processes,
+        # each worker handling an interleaved slice of the hashtags. Each worker's
+        # tweets are yielded as soon as it finishes, minus any already yielded.
+        processes = min(len(self.hashtags), MAX_WORKERS)
+        chunks = [self.hashtags[i::processes] for i in range(processes)]
         total_collected = 0
-        for hashtag in self.hashtags:
-            count = self.scrape_hashtag(hashtag)
-            total_collected += count
+        with multiprocessing.Pool(processes=processes) as pool:
+            for tweets in pool.imap_unordered(self._scrape_chunk, chunks):
+                batch = []
+                for tweet in tweets:
+                    key = tweet_key(tweet)
+                    if key in self.seen_keys:
+                        continue
+                    batch.append(tweet)
+                    self.seen_keys.add(key)
+                total_collected += len(batch)
+                yield batch
         logging.info(f"Total tweets collected: {total_collected}")
+
+    def run(self):
+        for batch in self.iter_batches():
+            self.tweets.extend(batch)